@@ -0,0 +1,114 @@
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from main import (
+    REEL_SIZE_COLUMN,
+    SUPPLIER_ID_COLUMN,
+    apply_delta,
+    diff_expected,
+    load_expected_quantities,
+    print_diff,
+    resolve_sheet_path,
+)
+
+def write_bench_sheet(path: Path, rows: int) -> None:
+    """
+    Write a consolidated-style .xlsx with `rows` data rows spread over
+    rows // 10 supplier IDs, plus a 'Grand Total' row like the real pivot.
+    """
+    import openpyxl
+
+    width = max(SUPPLIER_ID_COLUMN, REEL_SIZE_COLUMN) + 1
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    header = [f"col{i}" for i in range(width)]
+    ws.append(header)
+
+    ids = max(rows // 10, 1)
+    row = [None] * width
+    for i in range(rows):
+        row[SUPPLIER_ID_COLUMN] = f"01S{i % ids:07d}-00"
+        row[REEL_SIZE_COLUMN] = 5000
+        ws.append(row)
+    row[SUPPLIER_ID_COLUMN] = "Grand Total"
+    row[REEL_SIZE_COLUMN] = rows * 5000
+    ws.append(row)
+    wb.save(path)
+
+def run_benchmark(rows: int = 1_000_000) -> None:
+    """
+    Time a diff end to end: load a generated `rows`-row .xlsx with
+    load_expected_quantities, then diff it against a revision with ~10% of
+    IDs added, removed and changed, and apply that delta.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        sheet_path = Path(tmp) / "bench.xlsx"
+        print(f"Writing {rows}-row sheet...")
+        write_bench_sheet(sheet_path, rows)
+
+        start = time.perf_counter()
+        old = load_expected_quantities(sheet_path)
+        load_secs = time.perf_counter() - start
+
+    ids = list(old)
+    tenth = len(ids) // 10
+    new = {sid: dict(rec) for sid, rec in old.items()}
+    for sid in ids[:tenth]:
+        del new[sid]
+    for sid in ids[tenth:2 * tenth]:
+        new[sid]["total_quantity"] += 5000
+    for i in range(tenth):
+        new[f"02S{i:07d}-00"] = {"total_quantity": 5000, "seen_quantity": 0}
+
+    start = time.perf_counter()
+    delta = diff_expected(old, new)
+    diff_secs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    apply_delta(old, delta)
+    apply_secs = time.perf_counter() - start
+
+    print(
+        f"  IDs: {len(ids)}, Added: {len(delta['added'])}, "
+        f"Removed: {len(delta['removed'])}, Changed: {len(delta['changed'])}"
+    )
+    print(f"  load_expected_quantities: {load_secs:.3f}s")
+    print(f"  diff_expected:            {diff_secs:.3f}s")
+    print(f"  apply_delta:              {apply_secs:.3f}s")
+
+def main() -> None:
+    args = sys.argv[1:]
+
+    if args and args[0] == "--bench":
+        try:
+            rows = int(args[1]) if len(args) > 1 else 1_000_000
+        except ValueError:
+            print(f"Invalid row count '{args[1]}'. Please enter a number.", file=sys.stderr)
+            sys.exit(1)
+        run_benchmark(rows)
+        return
+
+    if len(args) < 2:
+        print(
+            "Usage: python diff.py <sheet> <sheet> [<sheet> ...]\n"
+            "       python diff.py --bench [rows]",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    #parse every sheet once, then diff each against the next
+    try:
+        tables = [load_expected_quantities(resolve_sheet_path(a)) for a in args]
+    except Exception as e:
+        print(f"Failed to load consolidated sheets: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    for i in range(1, len(tables)):
+        delta = diff_expected(tables[i - 1], tables[i])
+        print_diff(args[i - 1], args[i], delta)
+
+
+if __name__ == "__main__":
+    main()
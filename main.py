@@ -1,10 +1,14 @@
 import sys
 from pathlib import Path
+import numpy as np
 import pandas as pd
 import os
 import re
 import tempfile
 import subprocess
+import hashlib
+import math
+import sqlite3
 
 import pyxlsb
 
@@ -14,8 +18,14 @@ SUPPLIER_ID_COLUMN = 0
 REEL_SIZE_COLUMN = 4
 
 ROOT_DIR = Path(__file__).resolve().parent
-CONSOLIDATED_PATH = ROOT_DIR / "input" / CONSOLIDATED_SHEET_NAME
+INPUT_DIR = ROOT_DIR / "input"
+CONSOLIDATED_PATH = INPUT_DIR / CONSOLIDATED_SHEET_NAME
 BARCODE_CSV_PATH = ROOT_DIR / "data" / "barcode-data-new-master.csv"
+# Shared across sessions/stations: point this at a network path to share it
+REEL_INDEX_PATH = ROOT_DIR / "data" / "reel-index.sqlite3"
+# Size of the optional in-memory Bloom filter in front of the reel index
+# (expected number of reels); 0 turns it off
+REEL_BLOOM_CAPACITY = 0
 BARTEND_EXE = r"C:\Program Files\Seagull\BarTender 2022\BarTend.exe"
 PRINTER_NAME = "TSC TE244"
 BTW_TEMPLATE = r"C:\Users\ems\Desktop\inventory-management\Inventronix\label.btw"
@@ -32,14 +42,19 @@ def load_expected_quantities(consolidated_path: Path) -> dict:
     if not consolidated_path.exists():
         raise FileNotFoundError(f"Expected file not found: {consolidated_path}")
 
-    # Determine file type and read accordingly
-    if consolidated_path.suffix.lower() == ".xlsb":
-        try:
-            df = pd.read_excel(consolidated_path, engine="pyxlsb")
-        except ImportError:
-            raise ImportError("pyxlsb is required to read .xlsb files. Install it with: pip install pyxlsb")
-    else:
-        df = pd.read_excel(consolidated_path, engine="openpyxl")
+    # calamine (pandas >= 2.2 + python-calamine) reads both xlsx and xlsb
+    # several times faster; fall back to openpyxl / pyxlsb without it
+    try:
+        df = pd.read_excel(consolidated_path, engine="calamine")
+    except (ImportError, ValueError):
+        # Determine file type and read accordingly
+        if consolidated_path.suffix.lower() == ".xlsb":
+            try:
+                df = pd.read_excel(consolidated_path, engine="pyxlsb")
+            except ImportError:
+                raise ImportError("pyxlsb is required to read .xlsb files. Install it with: pip install pyxlsb")
+        else:
+            df = pd.read_excel(consolidated_path, engine="openpyxl")
     
     supplier_col_idx = SUPPLIER_ID_COLUMN
     qty_col_idx = REEL_SIZE_COLUMN
@@ -50,24 +65,27 @@ def load_expected_quantities(consolidated_path: Path) -> dict:
         )
 
     supplier_ids = df.iloc[:, supplier_col_idx]
-    quantities = df.iloc[:, qty_col_idx]
+    quantities = pd.to_numeric(df.iloc[:, qty_col_idx], errors="coerce")
+
+    # Vectorised so 1M-row sheets aggregate in well under a second:
+    # drop blank / non-numeric rows and the pivot's 'Grand Total' row,
+    # truncate quantities like int() and sum per supplier ID
+    keep = (
+        supplier_ids.notna()
+        & quantities.notna()
+        & np.isfinite(quantities)
+        & (supplier_ids != 'Grand Total')
+    )
+    totals = (
+        quantities[keep]
+        .astype("int64")
+        .groupby(supplier_ids[keep].astype(str).str.strip(), sort=False)
+        .sum()
+    )
 
     expected = {}
-    for sid, qty in zip(supplier_ids, quantities):
-        if pd.isna(sid) or pd.isna(qty):
-            continue
-        if sid == 'Grand Total':
-            continue
-        
-        sid_str = str(sid).strip()
-        try:
-            qty_val = int(qty)
-        except (TypeError, ValueError):
-            continue
-
-        if sid_str not in expected:
-            expected[sid_str] = {"total_quantity": 0, "seen_quantity": 0}
-        expected[sid_str]["total_quantity"] += qty_val
+    for sid_str, total_q in totals.items():
+        expected[sid_str] = {"total_quantity": int(total_q), "seen_quantity": 0}
 
     return expected
 
@@ -112,6 +130,250 @@ def load_barcode_reference(barcode_csv_path: Path) -> dict:
 
     return reference
 
+def resolve_sheet_path(name: str) -> Path:
+    """Accept a full path or just a file name inside input/."""
+    path = Path(name)
+    if not path.exists() and (INPUT_DIR / name).exists():
+        return INPUT_DIR / name
+    return path
+
+def diff_expected(old: dict, new: dict) -> dict:
+    """
+    Compare two expected tables (as returned by load_expected_quantities)
+    by supplier ID and build a delta dict:
+        {"added": {supplier_id: total_quantity},
+         "removed": {supplier_id: total_quantity},
+         "changed": {supplier_id: (old_total, new_total)}}
+
+    Both tables are already hashed by supplier ID, so this is a single
+    hash join over each side rather than a pairwise rescan.
+    """
+    added = {}
+    changed = {}
+    for sid, rec in new.items():
+        old_rec = old.get(sid)
+        if old_rec is None:
+            added[sid] = rec["total_quantity"]
+        elif old_rec["total_quantity"] != rec["total_quantity"]:
+            changed[sid] = (old_rec["total_quantity"], rec["total_quantity"])
+
+    # An ID already at 0 (removed earlier but kept for its scans) is not
+    # reported as removed again
+    removed = {
+        sid: rec["total_quantity"]
+        for sid, rec in old.items()
+        if sid not in new and rec["total_quantity"] > 0
+    }
+
+    return {"added": added, "removed": removed, "changed": changed}
+
+def apply_delta(expected: dict, delta: dict) -> list:
+    """
+    Apply a delta from diff_expected to a live expected table in place.
+    seen_quantity is kept for every ID that already exists. A removed ID
+    that has already been scanned stays in the table with total_quantity 0;
+    otherwise it is dropped.
+
+    Returns [(supplier_id, total_quantity, seen_quantity)] for every ID
+    that is now over-received (seen > new total) so it can be reported.
+    final_reconciliation also lists these under "Over-received".
+    """
+    for sid, total_q in delta["added"].items():
+        if sid in expected:
+            expected[sid]["total_quantity"] = total_q
+        else:
+            expected[sid] = {"total_quantity": total_q, "seen_quantity": 0}
+
+    for sid, (_, new_total) in delta["changed"].items():
+        if sid in expected:
+            expected[sid]["total_quantity"] = new_total
+        else:
+            expected[sid] = {"total_quantity": new_total, "seen_quantity": 0}
+
+    for sid in delta["removed"]:
+        rec = expected.get(sid)
+        if rec is None:
+            continue
+        if rec["seen_quantity"] > 0:
+            rec["total_quantity"] = 0
+        else:
+            del expected[sid]
+
+    over_received = []
+    for sid in list(delta["changed"]) + list(delta["removed"]):
+        rec = expected.get(sid)
+        if rec is not None and rec["seen_quantity"] > rec["total_quantity"]:
+            over_received.append((sid, rec["total_quantity"], rec["seen_quantity"]))
+
+    return over_received
+
+def print_diff(old_name: str, new_name: str, delta: dict) -> None:
+    print(f"\n=== Diff: {old_name} -> {new_name} ===")
+    added = delta["added"]
+    removed = delta["removed"]
+    changed = delta["changed"]
+
+    if not added and not removed and not changed:
+        print("No differences. ✅")
+        return
+
+    if added:
+        print(f"🟢 Added IDs ({len(added)}):")
+        print(f"{'Supplier ID':<20}{'Quantity':>10}")
+        print("-" * 30)
+        for sid in sorted(added):
+            print(f"{sid:<20}{added[sid]:>10}")
+        print()
+
+    if removed:
+        print(f"🔴 Removed IDs ({len(removed)}):")
+        print(f"{'Supplier ID':<20}{'Quantity':>10}")
+        print("-" * 30)
+        for sid in sorted(removed):
+            print(f"{sid:<20}{removed[sid]:>10}")
+        print()
+
+    if changed:
+        print(f"🟡 Quantity changes ({len(changed)}):")
+        print(f"{'Supplier ID':<20}{'Old':>10}{'New':>10}{'Change':>12}")
+        print("-" * 52)
+        for sid in sorted(changed):
+            old_q, new_q = changed[sid]
+            print(f"{sid:<20}{old_q:>10}{new_q:>10}{new_q - old_q:>+12}")
+        print()
+
+def print_over_received(over_received: list) -> None:
+    print("🟠 Over-received IDs (seen more than expected):")
+    print(f"{'Supplier ID':<20}{'Expected':>10}{'Seen':>10}{'Extra':>12}")
+    print("-" * 52)
+    for sid, total_q, seen_q in over_received:
+        print(f"{sid:<20}{total_q:>10}{seen_q:>10}{seen_q - total_q:>12}")
+    print()
+
+def load_reel_index(reel_index_path: Path, shipment: str, bloom_capacity: int = 0) -> dict:
+    """
+    Open (creating the table if needed) the sqlite reel-identity index and
+    build a dict:
+        {"conn": sqlite3.Connection, "shipment": str, "bloom": dict | None}
+
+    Each row is one recorded reel, keyed by the full composite barcode
+    (e.g. 01S2002310-00#20250809#A010001#0LUU#2532) with its supplier ID,
+    reel size and the shipment (consolidated sheet) it was scanned against.
+    Lookups go through the primary-key index, so history stays on disk.
+
+    If bloom_capacity is set, an in-memory Bloom filter sized for that many
+    reels is built from the history and checked first, so most new reels
+    never touch the database. Reels recorded by other stations after
+    startup are not in it; those are still caught by record_reel.
+    """
+    conn = sqlite3.connect(reel_index_path, timeout=10)
+    with conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS reels ("
+            " reel_key TEXT PRIMARY KEY,"
+            " supplier_id TEXT NOT NULL,"
+            " reel_size INTEGER NOT NULL,"
+            " shipment TEXT NOT NULL,"
+            " scanned_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS reels_shipment ON reels (shipment)")
+
+    bloom = None
+    if bloom_capacity > 0:
+        bloom = _bloom_new(bloom_capacity)
+        for (reel_key,) in conn.execute("SELECT reel_key FROM reels"):
+            _bloom_add(bloom, reel_key)
+
+    return {"conn": conn, "shipment": shipment, "bloom": bloom}
+
+def _bloom_new(capacity: int, error_rate: float = 0.01) -> dict:
+    size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+    hashes = max(round(size / capacity * math.log(2)), 1)
+    return {"bits": bytearray((size + 7) // 8), "size": size, "hashes": hashes}
+
+def _bloom_positions(bloom: dict, reel_key: str) -> list:
+    digest = hashlib.blake2b(reel_key.encode("utf-8"), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    return [(h1 + i * h2) % bloom["size"] for i in range(bloom["hashes"])]
+
+def _bloom_add(bloom: dict, reel_key: str) -> None:
+    for pos in _bloom_positions(bloom, reel_key):
+        bloom["bits"][pos >> 3] |= 1 << (pos & 7)
+
+def _bloom_contains(bloom: dict, reel_key: str) -> bool:
+    return all(
+        bloom["bits"][pos >> 3] & (1 << (pos & 7))
+        for pos in _bloom_positions(bloom, reel_key)
+    )
+
+def is_duplicate_reel(index: dict, reel_key: str) -> bool:
+    bloom = index["bloom"]
+    if bloom is not None and not _bloom_contains(bloom, reel_key):
+        return False
+    row = index["conn"].execute(
+        "SELECT 1 FROM reels WHERE reel_key = ?", (reel_key,)
+    ).fetchone()
+    return row is not None
+
+def record_reel(index: dict, reel_key: str, supplier_id: str, reel_size: int) -> bool:
+    """
+    Record a reel against the index's shipment. Returns False (and records
+    nothing) if the reel is already recorded, including by another station;
+    the UNIQUE reel key makes the check and insert a single atomic step.
+    """
+    try:
+        with index["conn"] as conn:
+            conn.execute(
+                "INSERT INTO reels (reel_key, supplier_id, reel_size, shipment)"
+                " VALUES (?, ?, ?, ?)",
+                (reel_key, supplier_id, reel_size, index["shipment"]),
+            )
+    except sqlite3.IntegrityError:
+        return False
+
+    if index["bloom"] is not None:
+        _bloom_add(index["bloom"], reel_key)
+    return True
+
+def release_reel(index: dict, reel_key: str):
+    """
+    Remove a reel from the index so it can be scanned again. Returns
+    (supplier_id, reel_size, shipment) for the removed reel, or None if it
+    was not recorded.
+    """
+    with index["conn"] as conn:
+        row = conn.execute(
+            "SELECT supplier_id, reel_size, shipment FROM reels WHERE reel_key = ?",
+            (reel_key,),
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute("DELETE FROM reels WHERE reel_key = ?", (reel_key,))
+    return row
+
+def load_seen_quantities(index: dict) -> dict:
+    """
+    Sum the reels already recorded for the index's shipment:
+        {supplier_id: seen_quantity}
+    so a restarted session picks up where the last one stopped.
+    """
+    rows = index["conn"].execute(
+        "SELECT supplier_id, SUM(reel_size) FROM reels"
+        " WHERE shipment = ? GROUP BY supplier_id",
+        (index["shipment"],),
+    )
+    return {sid: int(seen_q) for sid, seen_q in rows}
+
+def get_reel_key(cleaned_id: str) -> str:
+    """
+    Return the reel identity for a scanned barcode, or "" if the scan does
+    not carry one (e.g. a supplier ID typed in by hand).
+    """
+    if "#" not in cleaned_id:
+        return ""
+    return cleaned_id
+
 def print_label(id_value: str):
     # CSV with header 'id' matching your field name in BarTender
     csv_content = "id\n" + id_value + "\n"
@@ -148,12 +410,18 @@ def generate_sticker_string(kem_id: str, reel_size: int) -> str:
     print(f"Sticker: {result}")
     return result
 
-def interactive_scan(expected: dict, reference: dict) -> None:
+def interactive_scan(expected: dict, reference: dict, reel_index: dict) -> None:
     """
     Interactive loop:
     - User enters supplier IDs (barcodes) and reel sizes one by one.
     - For each scan, print sticker info and update seen_quantity.
     - Enforce that seen_quantity never exceeds total_quantity for that ID.
+    - Reject a reel whose barcode is already in the reel-identity index; a
+      reel is only recorded once its label has printed.
+    - 'release <barcode>' removes a reel from the index so it can be
+      rescanned (and takes it off seen_quantity for this shipment).
+    - 'reload <sheet>' applies a revised consolidated sheet to expected,
+      keeping seen_quantity, and reports what changed (asks before removing IDs).
     - Exit when user inputs an empty string or 'done' / 'exit' / 'quit' for the ID.
     """
     print("\n=== Inbound Inventory Scanning ===")
@@ -169,6 +437,56 @@ def interactive_scan(expected: dict, reference: dict) -> None:
         if scanned_id == "" or scanned_id.lower() in {"done", "exit", "quit"}:
             break
 
+        #Apply a revised consolidated sheet without losing scans so far
+        if scanned_id.lower().startswith("reload "):
+            sheet_name = scanned_id[len("reload "):].strip()
+            try:
+                revised = load_expected_quantities(resolve_sheet_path(sheet_name))
+            except Exception as e:
+                print(f"  [ERROR] Could not load '{sheet_name}': {e}\n")
+                continue
+            if not revised:
+                print(f"  [ERROR] No valid expected quantities found in '{sheet_name}'.\n")
+                continue
+            delta = diff_expected(expected, revised)
+            print_diff("current", sheet_name, delta)
+            if delta["removed"]:
+                try:
+                    answer = input(
+                        f"Remove {len(delta['removed'])} IDs from the expected list? [y/N]: "
+                    ).strip().lower()
+                except (EOFError, KeyboardInterrupt):
+                    answer = ""
+                if answer not in {"y", "yes"}:
+                    print("  Reload cancelled; expected list unchanged.\n")
+                    continue
+            over_received = apply_delta(expected, delta)
+            if over_received:
+                print_over_received(over_received)
+            continue
+
+        #Take a reel out of the index, e.g. after a wrong scan
+        if scanned_id.lower().startswith("release "):
+            barcode = re.sub(r"\x1b\[[0-9;]*[A-Za-z~]", "", scanned_id[len("release "):]).strip()
+            reel_key = get_reel_key(barcode)
+            if not reel_key:
+                print(f"  [ERROR] '{barcode}' is not a full reel barcode.\n")
+                continue
+            try:
+                released = release_reel(reel_index, reel_key)
+            except (sqlite3.Error, OSError) as e:
+                print(f"  [ERROR] Could not update reel index: {e}\n")
+                continue
+            if released is None:
+                print(f"  [ERROR] Reel '{reel_key}' is not in the reel index.\n")
+                continue
+            supplier_id, reel_size, shipment = released
+            if shipment == reel_index["shipment"] and supplier_id in expected:
+                rec = expected[supplier_id]
+                rec["seen_quantity"] = max(rec["seen_quantity"] - reel_size, 0)
+            print(f"  [INFO] Released reel '{reel_key}'; it can be scanned again.\n")
+            continue
+
         #clean out scanner noise (ANSI escape codes) and extract ID
         cleaned_id = re.sub(r"\x1b\[[0-9;]*[A-Za-z~]", "", scanned_id).strip()
         if not cleaned_id:
@@ -238,6 +556,42 @@ def interactive_scan(expected: dict, reference: dict) -> None:
             print(" ❌ This scan has been IGNORED. Please verify the item.\n")
             continue
 
+        #Check this exact reel has not been scanned before, here or at
+        #another station
+        reel_key = get_reel_key(cleaned_id)
+        try:
+            if reel_key and is_duplicate_reel(reel_index, reel_key):
+                print(f"  [ERROR] Reel '{reel_key}' has already been scanned.")
+                print(" ❌ This scan has been IGNORED. Please verify the item.\n")
+                continue
+        except (sqlite3.Error, OSError) as e:
+            print(f"  [ERROR] Could not check reel index: {e}")
+            print(" ❌ This scan has been IGNORED. Please rescan.\n")
+            continue
+
+        #Generate sticker string and print
+        sticker_location = generate_sticker_string(kem_id, reel_size)
+        try:
+            print_sticker(sticker_location)
+        except (subprocess.CalledProcessError, OSError) as e:
+            print(f"  [ERROR] Could not print sticker: {e}")
+            print(" ❌ This scan has been IGNORED. Please rescan.\n")
+            continue
+
+        #Record reel only now the label exists, so a failed print never
+        #leaves a reel that can't be rescanned
+        if reel_key:
+            try:
+                recorded = record_reel(reel_index, reel_key, supplier_id, reel_size)
+            except (sqlite3.Error, OSError) as e:
+                print(f"  [ERROR] Could not record reel in reel index: {e}")
+                print(" ❌ This scan has been IGNORED. Discard the label and rescan.\n")
+                continue
+            if not recorded:
+                print(f"  [ERROR] Reel '{reel_key}' was just scanned at another station.")
+                print(" ❌ This scan has been IGNORED. Discard the label just printed.\n")
+                continue
+
         #Update seen quantity, remaining quantity
         rec["seen_quantity"] = new_seen
         remaining = rec["total_quantity"] - rec["seen_quantity"]
@@ -248,10 +602,6 @@ def interactive_scan(expected: dict, reference: dict) -> None:
             print(f"  Remaining quantity to scan for this ID: {remaining}")
         else:
             print("  ✅ This ID is now fully matched.")
-
-        #Generate sticker string and print
-        sticker_location = generate_sticker_string(kem_id, reel_size)
-        print_sticker(sticker_location)
         print()
 
 def final_reconciliation(expected: dict) -> None:
@@ -261,8 +611,11 @@ def final_reconciliation(expected: dict) -> None:
     - Fully matched (seen == expected)
     - Partially matched (0 < seen < expected)
     - Not seen at all (seen == 0 < expected)
+    - Over-received (seen > expected), e.g. after a revised sheet lowered
+      or removed an ID that had already been scanned
     """
     print("\n=== Final Reconciliation ===")
+    over_received = []
     fully_matched = []
     partial = []
     not_seen = []
@@ -271,21 +624,28 @@ def final_reconciliation(expected: dict) -> None:
         total_q = rec["total_quantity"]
         seen_q = rec["seen_quantity"]
 
+        if seen_q > total_q:
+            over_received.append((sid, total_q, seen_q))
+            continue
+
         # Ignore any weird rows with non-positive expected quantity
         if total_q <= 0:
             continue
 
-        if seen_q >= total_q:
+        if seen_q == total_q:
             fully_matched.append((sid, total_q, seen_q))
         elif seen_q > 0:
             partial.append((sid, total_q, seen_q, total_q - seen_q))
         else:
             not_seen.append((sid, total_q))
 
-    if not partial and not not_seen:
+    if not partial and not not_seen and not over_received:
         print("All supplier IDs are fully matched. ✅ 🟢")
         return
 
+    if over_received:
+        print_over_received(over_received)
+
     if fully_matched:
         print(f"🟢 Fully matched IDs ({len(fully_matched)}):")
         for sid, total_q, seen_q in fully_matched:
@@ -312,6 +672,10 @@ def main() -> None:
     try:
         expected = load_expected_quantities(CONSOLIDATED_PATH)
         reference = load_barcode_reference(BARCODE_CSV_PATH)
+        reel_index = load_reel_index(
+            REEL_INDEX_PATH, CONSOLIDATED_SHEET_NAME, REEL_BLOOM_CAPACITY
+        )
+        seen = load_seen_quantities(reel_index)
 
         print(expected)
         print("\n\n")
@@ -330,7 +694,15 @@ def main() -> None:
         print("No valid barcode reference data found in barcode-data-new-master.csv.", file=sys.stderr)
         sys.exit(1)
 
-    interactive_scan(expected, reference)
+    #Carry on from reels already recorded for this shipment
+    for sid, seen_q in seen.items():
+        if sid not in expected:
+            expected[sid] = {"total_quantity": 0, "seen_quantity": 0}
+        expected[sid]["seen_quantity"] = seen_q
+    if seen:
+        print(f"[INFO] Restored seen quantities for {len(seen)} IDs from the reel index.")
+
+    interactive_scan(expected, reference, reel_index)
     final_reconciliation(expected)
 
 
@@ -0,0 +1,134 @@
+import openpyxl
+
+import main
+from main import apply_delta, diff_expected, final_reconciliation, load_expected_quantities
+
+
+def table(**totals):
+    return {
+        sid: {"total_quantity": total_q, "seen_quantity": 0}
+        for sid, total_q in totals.items()
+    }
+
+
+def write_sheet(path, rows):
+    width = max(main.SUPPLIER_ID_COLUMN, main.REEL_SIZE_COLUMN) + 1
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append([f"col{i}" for i in range(width)])
+    for sid, qty in rows:
+        row = [None] * width
+        row[main.SUPPLIER_ID_COLUMN] = sid
+        row[main.REEL_SIZE_COLUMN] = qty
+        ws.append(row)
+    wb.save(path)
+
+
+def test_load_expected_quantities_sums_and_skips_bad_rows(tmp_path):
+    path = tmp_path / "consolidated.xlsx"
+    write_sheet(path, [
+        ("B ", 4000),
+        ("A", 1000),
+        ("B", 2000),
+        ("C", None),
+        (None, 500),
+        ("D", "n/a"),
+        ("A", 1500.7),
+        ("Grand Total", 9999),
+    ])
+
+    expected = load_expected_quantities(path)
+
+    assert list(expected) == ["B", "A"]
+    assert expected["B"] == {"total_quantity": 6000, "seen_quantity": 0}
+    assert expected["A"] == {"total_quantity": 2500, "seen_quantity": 0}
+
+
+def test_diff_expected():
+    delta = diff_expected(table(A=10, B=20, C=30), table(A=10, B=25, D=40))
+
+    assert delta == {
+        "added": {"D": 40},
+        "removed": {"C": 30},
+        "changed": {"B": (20, 25)},
+    }
+
+
+def test_apply_delta_keeps_seen_and_reports_over_received():
+    expected = table(A=10, B=20, C=30, E=5)
+    expected["A"]["seen_quantity"] = 8
+    expected["B"]["seen_quantity"] = 15
+    expected["C"]["seen_quantity"] = 10
+
+    delta = diff_expected(expected, table(A=12, B=10, D=40))
+    over_received = apply_delta(expected, delta)
+
+    assert expected == {
+        "A": {"total_quantity": 12, "seen_quantity": 8},
+        "B": {"total_quantity": 10, "seen_quantity": 15},
+        "C": {"total_quantity": 0, "seen_quantity": 10},
+        "D": {"total_quantity": 40, "seen_quantity": 0},
+    }
+    assert sorted(over_received) == [("B", 10, 15), ("C", 0, 10)]
+
+
+def test_final_reconciliation_lists_over_received(capsys):
+    expected = table(A=10, B=10, C=0)
+    expected["A"]["seen_quantity"] = 10
+    expected["B"]["seen_quantity"] = 15
+    expected["C"]["seen_quantity"] = 10
+
+    final_reconciliation(expected)
+    out = capsys.readouterr().out
+
+    assert "All supplier IDs are fully matched" not in out
+    assert "Over-received" in out
+    assert "B" in out and "C" in out
+
+
+def reload(tmp_path, monkeypatch, expected, rows, answers=()):
+    path = tmp_path / "consolidated-19.xlsx"
+    write_sheet(path, rows)
+    inputs = iter([f"reload {path}", *answers, "done"])
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(inputs))
+    reel_index = main.load_reel_index(tmp_path / "reel-index.sqlite3", "consolidated-18.xlsb")
+    main.interactive_scan(expected, {}, reel_index)
+
+
+def test_diff_expected_skips_ids_already_at_zero():
+    old = table(A=10, B=0)
+    old["B"]["seen_quantity"] = 4
+
+    assert diff_expected(old, table(A=10))["removed"] == {}
+
+
+def test_interactive_scan_reload(tmp_path, monkeypatch, capsys):
+    expected = table(A=10, C=30)
+    expected["A"]["seen_quantity"] = 8
+
+    reload(tmp_path, monkeypatch, expected, [("A", 12), ("D", 40)], answers=["y"])
+
+    assert expected == {
+        "A": {"total_quantity": 12, "seen_quantity": 8},
+        "D": {"total_quantity": 40, "seen_quantity": 0},
+    }
+    assert "Quantity changes" in capsys.readouterr().out
+
+
+def test_interactive_scan_reload_removal_needs_confirmation(tmp_path, monkeypatch):
+    expected = table(A=10, C=30)
+
+    reload(tmp_path, monkeypatch, expected, [("A", 12)], answers=["n"])
+
+    assert expected == table(A=10, C=30)
+
+
+def test_interactive_scan_reload_rejects_empty_sheet(tmp_path, monkeypatch, capsys):
+    expected = table(A=10, B=20)
+    expected["B"]["seen_quantity"] = 4
+
+    reload(tmp_path, monkeypatch, expected, [("A", "n/a"), ("B", "n/a")])
+
+    assert expected["A"] == {"total_quantity": 10, "seen_quantity": 0}
+    assert expected["B"] == {"total_quantity": 20, "seen_quantity": 4}
+    assert "No valid expected quantities" in capsys.readouterr().out
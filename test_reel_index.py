@@ -0,0 +1,122 @@
+import subprocess
+
+import main
+from main import (
+    get_reel_key,
+    is_duplicate_reel,
+    load_reel_index,
+    load_seen_quantities,
+    record_reel,
+    release_reel,
+)
+
+SID = "01S2002310-00"
+REEL = "01S2002310-00#20250809#A010001#0LUU#2532"
+OTHER_REEL = "01S2002310-00#20250809#A010002#0LUU#2532"
+
+
+def test_get_reel_key_needs_composite_barcode():
+    assert get_reel_key(REEL) == REEL
+    assert get_reel_key(SID) == ""
+
+
+def test_record_rejects_repeat_and_persists(tmp_path):
+    path = tmp_path / "reel-index.sqlite3"
+    index = load_reel_index(path, "consolidated-18.xlsb")
+
+    assert not is_duplicate_reel(index, REEL)
+    assert record_reel(index, REEL, SID, 4000)
+    assert is_duplicate_reel(index, REEL)
+    assert not record_reel(index, REEL, SID, 4000)
+
+    # A later session, or another station, sees the same history
+    assert is_duplicate_reel(load_reel_index(path, "consolidated-19.xlsb"), REEL)
+
+
+def test_record_catches_reel_from_other_station_past_bloom(tmp_path):
+    path = tmp_path / "reel-index.sqlite3"
+    station_a = load_reel_index(path, "consolidated-18.xlsb", bloom_capacity=1000)
+    station_b = load_reel_index(path, "consolidated-18.xlsb", bloom_capacity=1000)
+
+    assert record_reel(station_a, REEL, SID, 4000)
+    assert is_duplicate_reel(station_a, REEL)
+    # Station B's Bloom filter predates the insert, but the insert still fails
+    assert not is_duplicate_reel(station_b, REEL)
+    assert not record_reel(station_b, REEL, SID, 4000)
+
+
+def test_bloom_filter_built_from_history(tmp_path):
+    path = tmp_path / "reel-index.sqlite3"
+    record_reel(load_reel_index(path, "consolidated-18.xlsb"), REEL, SID, 4000)
+
+    index = load_reel_index(path, "consolidated-18.xlsb", bloom_capacity=1000)
+    assert is_duplicate_reel(index, REEL)
+    assert not is_duplicate_reel(index, OTHER_REEL)
+
+
+def test_seen_quantities_are_per_shipment_and_release(tmp_path):
+    path = tmp_path / "reel-index.sqlite3"
+    index = load_reel_index(path, "consolidated-18.xlsb")
+    record_reel(index, REEL, SID, 4000)
+    record_reel(index, OTHER_REEL, SID, 2000)
+    record_reel(load_reel_index(path, "consolidated-14.xlsx"), SID + "#1#2", SID, 99)
+
+    assert load_seen_quantities(index) == {SID: 6000}
+
+    assert release_reel(index, REEL) == (SID, 4000, "consolidated-18.xlsb")
+    assert release_reel(index, REEL) is None
+    assert not is_duplicate_reel(index, REEL)
+    assert load_seen_quantities(index) == {SID: 2000}
+
+
+def scan(monkeypatch, expected, reel_index, lines):
+    inputs = iter(lines + ["done"])
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(inputs))
+    main.interactive_scan(expected, {SID: {"kem_id": "IN" + SID}}, reel_index)
+
+
+def test_interactive_scan_rejects_repeat_and_stays_in_sync(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "print_sticker", lambda sticker: None)
+    expected = {SID: {"total_quantity": 10000, "seen_quantity": 0}}
+    index = load_reel_index(tmp_path / "reel-index.sqlite3", "consolidated-18.xlsb")
+
+    scan(monkeypatch, expected, index, [REEL, "4000", REEL, "4000", OTHER_REEL, "4000"])
+
+    assert expected[SID]["seen_quantity"] == 8000
+
+
+def test_interactive_scan_failed_print_does_not_record(tmp_path, monkeypatch):
+    def fail(sticker):
+        raise subprocess.CalledProcessError(1, "BarTend.exe")
+
+    monkeypatch.setattr(main, "print_sticker", fail)
+    expected = {SID: {"total_quantity": 10000, "seen_quantity": 0}}
+    index = load_reel_index(tmp_path / "reel-index.sqlite3", "consolidated-18.xlsb")
+
+    scan(monkeypatch, expected, index, [REEL, "4000"])
+
+    assert expected[SID]["seen_quantity"] == 0
+    assert not is_duplicate_reel(index, REEL)
+
+
+def test_interactive_scan_survives_index_errors(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(main, "print_sticker", lambda sticker: None)
+    expected = {SID: {"total_quantity": 10000, "seen_quantity": 0}}
+    index = load_reel_index(tmp_path / "reel-index.sqlite3", "consolidated-18.xlsb")
+    index["conn"].close()
+
+    scan(monkeypatch, expected, index, [REEL, "4000", f"release {REEL}"])
+
+    assert expected[SID]["seen_quantity"] == 0
+    assert "Could not check reel index" in capsys.readouterr().out
+
+
+def test_interactive_scan_release(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "print_sticker", lambda sticker: None)
+    expected = {SID: {"total_quantity": 10000, "seen_quantity": 0}}
+    index = load_reel_index(tmp_path / "reel-index.sqlite3", "consolidated-18.xlsb")
+
+    scan(monkeypatch, expected, index, [REEL, "4000", f"release {REEL}", REEL, "5000"])
+
+    assert expected[SID]["seen_quantity"] == 5000
+    assert load_seen_quantities(index) == {SID: 5000}